@@ -0,0 +1,109 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from fastapi.responses import Response
+
+# ==========================================
+# PRECOMPRESSED STATIC RESPONSES
+# ==========================================
+# The front end and its vendored CSS/font are fixed for the life of the
+# process, so each one is encoded once at startup: identity and gzip bodies,
+# each with a strong ETag of its own. A request only picks a representation
+# from Accept-Encoding and answers If-None-Match with a bodiless 304.
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+# Only a URL carrying the current content fingerprint (static_url) can be
+# cached for good; anything else, and the page naming those URLs, revalidates
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+# Not worth gzipping below this, nor formats that are compressed already
+MIN_GZIP_BYTES = 512
+COMPRESSED_TYPES = ("font/woff2", "font/woff", "image/png", "image/jpeg")
+mimetypes.add_type("font/woff2", ".woff2")
+
+def accepts_gzip(header):
+    for item in (header or "").split(","):
+        coding, _, params = item.partition(";")
+        if coding.strip().lower() not in ("gzip", "*"):
+            continue
+        q = params.strip().lower()
+        try:
+            return not q.startswith("q=") or float(q[2:]) > 0
+        except ValueError:
+            return False
+    return False
+
+def etag_matches(header, etags):
+    # If-None-Match uses the weak comparison: W/ prefixes are ignored
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") in etags for tag in tags)
+
+class StaticAsset:
+    def __init__(self, body, media_type, fingerprinted=True):
+        self.body = body
+        self.media_type = media_type
+        self.fingerprinted = fingerprinted
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.fingerprint = digest[:12]
+        self.gzip_body = None
+        self.gzip_etag = None
+        if len(body) >= MIN_GZIP_BYTES and media_type not in COMPRESSED_TYPES:
+            # mtime=0 keeps the bytes, and so the ETag, identical across restarts
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < len(body):
+                self.gzip_body = compressed
+                self.gzip_etag = f'"{digest}-gzip"'
+        self.etags = {self.etag, self.gzip_etag} - {None}
+
+    @classmethod
+    def from_file(cls, path):
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if media_type.startswith("text/"):
+            media_type += "; charset=utf-8"
+        with open(path, "rb") as f:
+            return cls(f.read(), media_type)
+
+    def respond(self, request):
+        compressed = self.gzip_body is not None and accepts_gzip(request.headers.get("accept-encoding"))
+        current = self.fingerprinted and request.query_params.get("v") == self.fingerprint
+        headers = {
+            "ETag": self.gzip_etag if compressed else self.etag,
+            "Cache-Control": IMMUTABLE if current else REVALIDATE,
+        }
+        if self.gzip_body is not None:
+            headers["Vary"] = "Accept-Encoding"
+        # Either encoding's ETag validates: both carry the same content
+        if etag_matches(request.headers.get("if-none-match"), self.etags):
+            return Response(status_code=304, headers=headers)
+        if compressed:
+            headers["Content-Encoding"] = "gzip"
+            return Response(self.gzip_body, media_type=self.media_type, headers=headers)
+        return Response(self.body, media_type=self.media_type, headers=headers)
+
+# url(...) references in a stylesheet, minus any query/fragment
+CSS_URL = re.compile(r"""url\((['"]?)([^'")?#]+)[^'")]*\1\)""")
+
+def load_static(directory=STATIC_DIR):
+    assets = {}
+    names = sorted(name for name in os.listdir(directory) if not name.startswith("."))
+    # Stylesheets last: their url(...)s are rewritten to the fingerprinted URLs
+    # of the files they reference, so a replaced font changes the CSS too
+    for name in sorted(names, key=lambda name: name.endswith(".css")):
+        path = os.path.join(directory, name)
+        if not name.endswith(".css"):
+            assets[name] = StaticAsset.from_file(path)
+            continue
+        with open(path, encoding="utf-8") as f:
+            css = CSS_URL.sub(
+                lambda m: f"url('{static_url(assets, m.group(2))}')" if m.group(2) in assets else m.group(0), f.read(),
+            )
+        assets[name] = StaticAsset(css.encode(), "text/css; charset=utf-8")
+    return assets
+
+def static_url(assets, name):
+    return f"/static/{name}?v={assets[name].fingerprint}"
@@ -0,0 +1,195 @@
+import codecs
+import csv
+import io
+import json
+import re
+
+from python_multipart.exceptions import FormParserError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+
+# ==========================================
+# BULK FILE PARSING
+# ==========================================
+# Incremental CSV / NDJSON parsing for /predict/upload. Input columns match the
+# DataFrame built by train.generate_logical_data; 'Credit Score' is ignored.
+INPUT_COLUMNS = {
+    'Age': 'age', 'Gender': 'gender', 'Income': 'income', 'Education': 'education',
+    'Marital Status': 'marital_status', 'Number of Children': 'children', 'Home Ownership': 'home_ownership',
+}
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+OUTPUT_COLUMNS = ["row", "credit_score", "positive", "negative", "model_version", "error"]
+
+def detect_format(content_type="", filename=""):
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    filename = (filename or "").lower()
+    if content_type in ("text/csv", "application/csv") or filename.endswith(".csv"):
+        return "csv"
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines") \
+            or filename.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+# Excel and classic Mac files end lines with a bare \r
+LINE_BREAK = re.compile(r"\r\n|\n|\r")
+# Only a partial line is ever buffered, so this bounds memory per upload
+MAX_LINE_CHARS = 64 * 1024
+
+async def iter_lines(chunks, encoding="utf-8", max_line=MAX_LINE_CHARS):
+    # Re-split an async stream of byte chunks into text lines without buffering the whole body
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        text = pending + decoder.decode(chunk)
+        # A trailing \r may be the first half of a \r\n split across chunks
+        held = "\r" if text.endswith("\r") else ""
+        *lines, pending = LINE_BREAK.split(text[:len(text) - len(held)])
+        pending += held
+        for line in lines:
+            if len(line) > max_line:
+                raise ValueError(f"Line longer than {max_line} characters")
+            yield line
+        if len(pending) > max_line:
+            raise ValueError(f"Line longer than {max_line} characters")
+    pending += decoder.decode(b"", final=True)
+    for line in LINE_BREAK.split(pending):
+        if len(line) > max_line:
+            raise ValueError(f"Line longer than {max_line} characters")
+        if line:
+            yield line
+
+class MultipartFile:
+    # One field of a multipart/form-data body, read off the request stream as
+    # it arrives. Request.form() would receive (and spool) the whole body
+    # before the handler sees the first byte. Other fields are skipped.
+    def __init__(self, stream, content_type, field="file"):
+        _, params = parse_options_header(content_type)
+        if not params.get(b"boundary"):
+            raise ValueError("Missing boundary in multipart/form-data body.")
+        self.stream = stream.__aiter__()
+        self.field = field
+        self.filename = None
+        self.content_type = None
+        self.found = False
+        self.done = False
+        self._headers = {}
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self._selected = False
+        self._data = []
+        self._parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._part_begin,
+            "on_header_field": lambda data, start, end: self._header_field.extend(data[start:end]),
+            "on_header_value": lambda data, start, end: self._header_value.extend(data[start:end]),
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        })
+
+    def _part_begin(self):
+        self._headers = {}
+
+    def _header_end(self):
+        self._headers[bytes(self._header_field).strip().lower()] = bytes(self._header_value).strip()
+        self._header_field.clear()
+        self._header_value.clear()
+
+    def _headers_finished(self):
+        _, params = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._selected = not self.found and params.get(b"name", b"").decode("latin-1") == self.field
+        if self._selected:
+            self.found = True
+            self.filename = params.get(b"filename", b"").decode("utf-8", "replace") or None
+            self.content_type = self._headers.get(b"content-type", b"").decode("latin-1") or None
+
+    def _part_data(self, data, start, end):
+        if self._selected:
+            self._data.append(bytes(data[start:end]))
+
+    def _part_end(self):
+        if self._selected:
+            self._selected = False
+            self.done = True
+
+    async def _feed(self):
+        # False once the request body is exhausted
+        chunk = await anext(self.stream, None)
+        if chunk is None:
+            return False
+        try:
+            self._parser.write(chunk)
+        except FormParserError as exc:
+            raise ValueError(f"Invalid multipart body: {exc}") from None
+        return True
+
+    async def open(self):
+        # Read up to the field's headers; False if the body has no such field
+        while not self.found:
+            if not await self._feed():
+                return False
+        return True
+
+    async def chunks(self):
+        while True:
+            data, self._data = self._data, []
+            for chunk in data:
+                yield chunk
+            if self.done or not await self._feed():
+                return
+
+def parse_csv_header(line):
+    header = next(csv.reader([line.lstrip("\ufeff")]))
+    missing = [column for column in INPUT_COLUMNS if column not in header]
+    if missing:
+        raise ValueError(f"CSV header is missing column(s): {', '.join(missing)}")
+    return [(header.index(column), field) for column, field in INPUT_COLUMNS.items()]
+
+def parse_csv_rows(lines, header):
+    rows = []
+    for values in csv.reader(lines):
+        try:
+            rows.append({field: values[i] for i, field in header})
+        except IndexError:
+            rows.append(ValueError(f"expected at least {max(i for i, _ in header) + 1} columns, got {len(values)}"))
+    return rows
+
+def parse_ndjson_rows(lines):
+    rows = []
+    for line in lines:
+        try:
+            record = json.loads(line)
+            rows.append({field: record[column] for column, field in INPUT_COLUMNS.items()})
+        except (ValueError, TypeError) as exc:
+            rows.append(ValueError(f"invalid JSON line: {exc}"))
+        except KeyError as exc:
+            rows.append(ValueError(f"missing column {exc.args[0]!r}"))
+    return rows
+
+def format_results(results, fmt, header=False):
+    if fmt == "ndjson":
+        return "".join(json.dumps(result) + "\n" for result in results)
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    if header:
+        writer.writerow(OUTPUT_COLUMNS)
+    for result in results:
+        analysis = result.get("analysis", {})
+        writer.writerow([
+            result["row"], result.get("credit_score", ""), " | ".join(analysis.get("positive", [])),
+            " | ".join(analysis.get("negative", [])), result.get("model_version", ""), result.get("error", ""),
+        ])
+    return out.getvalue()
+
+class BodyStreamingResponse(StreamingResponse):
+    # StreamingResponse normally listens for client disconnects on `receive`,
+    # which would swallow the request body we are still reading while we
+    # respond. request.stream() already raises ClientDisconnect by itself.
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
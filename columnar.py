@@ -0,0 +1,90 @@
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # optional: only Arrow IPC payloads need it
+    pa = None
+
+# ==========================================
+# BINARY COLUMNAR SCORING
+# ==========================================
+# Payload formats for /predict/columnar, for callers that already hold the
+# features as arrays and should not pay for JSON + pydantic per applicant.
+#
+# application/vnd.credit.columns (raw NumPy layout)
+#   Seven blocks of n little-endian float32 values, one per column in
+#   COLUMNS order, with nothing before or between them; n is the body size
+#   divided by 28. Categorical columns carry the model's integer codes,
+#   published by GET /predict/columnar. float32 is the precision the trees
+#   compare in, so nothing is lost. The body is used as-is through
+#   np.frombuffer: no parsing and no copy.
+#
+# application/vnd.apache.arrow.stream (Arrow IPC stream, needs pyarrow)
+#   One or more record batches with COLUMNS as field names. Numeric columns
+#   may be any integer or float type; categorical ones are strings, ideally
+#   dictionary-encoded so only the dictionary is looked up.
+#
+# The response body is n uint8 class indices; the X-Class-Labels header maps
+# them to labels in order.
+RAW_MEDIA_TYPE = "application/vnd.credit.columns"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+COLUMNS = ("age", "gender", "income", "education", "marital_status", "children", "home_ownership")
+INTEGER_COLUMNS = ("age", "children")
+
+def schema(encoder):
+    tables = encoder.category_tables()
+    return {
+        "media_types": [RAW_MEDIA_TYPE, ARROW_MEDIA_TYPE],
+        "columns": [
+            {"name": name, "dtype": "float32", **({"codes": tables[name]} if name in tables else {})}
+            for name in COLUMNS
+        ],
+        "classes": encoder.labels.tolist(),
+    }
+
+def parse_raw(body):
+    width = len(COLUMNS) * 4
+    if len(body) % width:
+        raise ValueError(f"Body size {len(body)} is not a multiple of {width} (7 float32 columns)")
+    # A read-only (n, 7) view over the request bytes
+    return np.frombuffer(body, dtype="<f4").reshape(len(COLUMNS), -1).T
+
+def parse_arrow(body, encoder):
+    try:
+        table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    except pa.ArrowInvalid as exc:
+        raise ValueError(f"Invalid Arrow IPC stream: {exc}") from None
+    missing = [name for name in COLUMNS if name not in table.column_names]
+    if missing:
+        raise ValueError(f"Arrow stream is missing column(s): {', '.join(missing)}")
+
+    tables = encoder.category_tables()
+    X = np.empty((table.num_rows, len(COLUMNS)), dtype=np.float32)
+    for position, name in enumerate(COLUMNS):
+        column = table.column(name).combine_chunks()
+        if column.null_count:
+            raise ValueError(f"{name}: null values are not allowed")
+        if name not in tables:
+            X[:, position] = column.to_numpy()
+        elif pa.types.is_dictionary(column.type):
+            # Look up each distinct category once, then gather by index
+            lookup = encoder.encode_category(name, column.dictionary.to_pylist(), index_rows=False)
+            X[:, position] = np.array(lookup, dtype=np.float32)[column.indices.to_numpy()]
+        else:
+            X[:, position] = encoder.encode_category(name, column.to_pylist())
+    return X
+
+def validate(X, encoder):
+    # The constraints CreditInput enforces, checked a column at a time
+    tables = encoder.category_tables()
+    for position, name in enumerate(COLUMNS):
+        column = X[:, position]
+        bad = ~np.isfinite(column) | (column < 0)
+        if name in INTEGER_COLUMNS or name in tables:
+            bad |= column != np.floor(column)
+        if name in tables:
+            bad |= column >= len(tables[name])
+        if bad.any():
+            row = int(np.argmax(bad))
+            raise ValueError(f"{name}: invalid value {column[row].item()!r} at row {row}")
@@ -0,0 +1,12 @@
+# ==========================================
+# ERRORS
+# ==========================================
+# Kept free of numpy/sklearn imports so main can register its handlers
+# without paying for the scoring stack at import time.
+class UnknownCategoryError(ValueError):
+    def __init__(self, field, value, allowed, index=None):
+        self.field = field
+        self.value = value
+        self.allowed = list(allowed)
+        self.index = index
+        super().__init__(f"Unknown {field} {value!r}; expected one of {', '.join(map(repr, self.allowed))}")
@@ -0,0 +1,162 @@
+import string
+
+# ==========================================
+# EXPLANATION RULES
+# ==========================================
+# The positive/negative analysis as a table. Each group behaves like an
+# if/elif chain: the first rule whose condition holds fires, and groups run
+# in order. Conditions only use comparisons combined with & and |, so one
+# table evaluates a single applicant (plain scalars) or whole columns (numpy
+# arrays). `negatives` counts the negative messages earlier groups produced.
+# numpy is imported inside the columnar helpers only, keeping `import main` light.
+POSITIVE, NEGATIVE = "positive", "negative"
+
+class Rule:
+    def __init__(self, polarity, condition, template):
+        self.polarity = polarity
+        self.positive = polarity == POSITIVE
+        self.condition = condition
+        self.template = template
+        self.fields = [name for _, name, _, _ in string.Formatter().parse(template) if name]
+
+    def render(self, facts):
+        return self.template.format(**{name: getattr(facts, name) for name in self.fields})
+
+RULES = (
+    # Income
+    (
+        Rule(POSITIVE, lambda f: f.income >= 90000, "Strong Income: ${income:,.0f} is a tier-1 indicator."),
+        Rule(NEGATIVE, lambda f: f.income < 40000, "Low Income: ${income:,.0f} is below approval threshold."),
+        Rule(NEGATIVE, lambda f: f.income < 60000, "Moderate Income: Limits high-tier approval without other assets."),
+    ),
+    # Home: renting is only a risk factor when income is also weak
+    (
+        Rule(POSITIVE, lambda f: f.home_ownership == "Owned", "Asset Verified: Home ownership provides strong collateral."),
+        Rule(NEGATIVE, lambda f: f.income < 70000, "Risk Factor: Renting combined with moderate income increases risk."),
+        Rule(NEGATIVE, lambda f: True, "Note: Renting status requires higher income verification."),
+    ),
+    # Marital
+    (
+        Rule(POSITIVE, lambda f: f.marital_status == "Married", "Stability: Marital status is a positive stability indicator."),
+    ),
+    # Children
+    (
+        Rule(NEGATIVE, lambda f: f.children > 2, "Liability: {children} dependents increases monthly obligations."),
+        Rule(POSITIVE, lambda f: f.children == 0, "Low Liability: No financial dependents detected."),
+    ),
+    # Education
+    (
+        Rule(POSITIVE, lambda f: (f.education == "Master's Degree") | (f.education == "Doctorate"),
+             "Education: {education} correlates with repayment consistency."),
+        Rule(NEGATIVE, lambda f: (f.education == "High School Diploma") & (f.label != "High"),
+             "Profile: Limited academic background affects score ceiling."),
+    ),
+    # Specific Average reasons
+    (
+        Rule(NEGATIVE, lambda f: (f.label == "Average") & (f.negatives == 0),
+             "Review Reason: Profile meets minimums but lacks strong assets (like Home or High Income)."),
+        Rule(NEGATIVE, lambda f: (f.label == "Average") & (f.home_ownership == "Rented") & (f.income > 50000),
+             "Conditional: Good income, but lack of property asset triggers manual review."),
+    ),
+    # Specific Low reasons
+    (
+        Rule(NEGATIVE, lambda f: (f.label == "Low") & (f.income < 40000) & (f.home_ownership == "Rented"),
+             "Critical: Combination of Low Income and Renting is high risk."),
+    ),
+)
+
+class Facts:
+    # One applicant (scalars) or a batch (equal-length numpy columns)
+    __slots__ = ("income", "children", "education", "marital_status", "home_ownership", "label", "negatives")
+
+    def __init__(self, income, children, education, marital_status, home_ownership, label, negatives=0):
+        self.income = income
+        self.children = children
+        self.education = education
+        self.marital_status = marital_status
+        self.home_ownership = home_ownership
+        self.label = label
+        self.negatives = negatives
+
+    @classmethod
+    def from_input(cls, data, label):
+        return cls(data.income, data.children, data.education, data.marital_status, data.home_ownership, label)
+
+    @classmethod
+    def from_features(cls, X, labels, encoder):
+        # Columns follow train.FEATURE_COLUMNS; categories are decoded back to strings
+        import numpy as np
+
+        return cls(
+            X[:, 2], X[:, 5].astype(np.int64),
+            encoder.categories(encoder.education, X[:, 3]),
+            encoder.categories(encoder.marital, X[:, 4]),
+            encoder.categories(encoder.home, X[:, 6]),
+            np.asarray(labels, dtype=object), np.zeros(len(X), dtype=np.int64),
+        )
+
+def explain_one(facts):
+    # Indexed by Rule.positive
+    messages = ([], [])
+    for group in RULES:
+        for rule in group:
+            if rule.condition(facts):
+                messages[rule.positive].append(rule.render(facts) if rule.fields else rule.template)
+                break
+        facts.negatives = len(messages[False])
+    return messages[True], messages[False]
+
+def _render_column(rule, facts, fired):
+    import numpy as np
+
+    if not rule.fields:
+        return rule.template
+    if len(rule.fields) > 1:
+        values = [np.asarray(getattr(facts, name))[fired].tolist() for name in rule.fields]
+        return [rule.template.format(**dict(zip(rule.fields, row))) for row in zip(*values)]
+    # Format each distinct value once (children, education, repeated incomes)
+    name = rule.fields[0]
+    unique, inverse = np.unique(np.asarray(getattr(facts, name))[fired], return_inverse=True)
+    rendered = np.array([rule.template.format(**{name: value}) for value in unique.tolist()], dtype=object)
+    return rendered[inverse]
+
+def explain_columns(facts):
+    # Each group fills at most one message per row and polarity, so it yields
+    # object columns (None where nothing fired); rows are zipped together once
+    import numpy as np
+
+    n = len(facts.label)
+    columns = {POSITIVE: [], NEGATIVE: []}
+    for group in RULES:
+        pending = np.ones(n, dtype=bool)
+        fired_negative = np.zeros(n, dtype=bool)
+        messages = {}
+        for rule in group:
+            fired = pending & rule.condition(facts)
+            pending &= ~fired
+            if not fired.any():
+                continue
+            if rule.polarity not in messages:
+                messages[rule.polarity] = np.full(n, None, dtype=object)
+            messages[rule.polarity][fired] = _render_column(rule, facts, fired)
+            if rule.polarity == NEGATIVE:
+                fired_negative |= fired
+        facts.negatives = facts.negatives + fired_negative
+        for polarity, column in messages.items():
+            columns[polarity].append(column.tolist())
+
+    def rows(polarity):
+        if not columns[polarity]:
+            return [[] for _ in range(n)]
+        return [[*filter(None, row)] for row in zip(*columns[polarity])]
+
+    return rows(POSITIVE), rows(NEGATIVE)
+
+# Below this many rows the fixed numpy cost per rule outweighs vectorizing
+COLUMNS_MIN_ROWS = 200
+
+def explain_batch(records, X, labels, encoder):
+    if len(records) < COLUMNS_MIN_ROWS:
+        explained = [explain_one(Facts.from_input(data, label)) for data, label in zip(records, labels)]
+        return [pos for pos, _ in explained], [neg for _, neg in explained]
+    return explain_columns(Facts.from_features(X, labels, encoder))
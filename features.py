@@ -0,0 +1,98 @@
+import numpy as np
+
+from errors import UnknownCategoryError
+
+# ==========================================
+# FEATURE ENCODING
+# ==========================================
+# Plain dict lookups built once from the fitted LabelEncoders, replacing the
+# per-request LabelEncoder.transform calls. Columns follow train.FEATURE_COLUMNS:
+# Age, Gender, Income, Education, Marital, Children, Home.
+class FeatureEncoder:
+    def __init__(self, gender, marital, home, education, labels):
+        self.gender = gender
+        self.marital = marital
+        self.home = home
+        self.education = education
+        self.labels = labels
+
+    @classmethod
+    def from_bundle(cls, bundle):
+        def table(encoder):
+            return {str(c): i for i, c in enumerate(encoder.classes_)}
+
+        return cls(
+            gender=table(bundle["le_gender"]),
+            marital=table(bundle["le_marital"]),
+            home=table(bundle["le_home"]),
+            education=dict(bundle["edu_mapping"]),
+            labels=np.array([str(c) for c in bundle["le_target"].classes_], dtype=object),
+        )
+
+    def _lookup(self, table, field, value, index=None):
+        try:
+            return table[value]
+        except KeyError:
+            raise UnknownCategoryError(field, value, table, index) from None
+
+    def encode_row(self, data):
+        return np.array([[
+            data.age,
+            self._lookup(self.gender, "gender", data.gender),
+            data.income,
+            self._lookup(self.education, "education", data.education),
+            self._lookup(self.marital, "marital_status", data.marital_status),
+            data.children,
+            self._lookup(self.home, "home_ownership", data.home_ownership),
+        ]], dtype=np.float64)
+
+    def _column(self, table, field, values):
+        try:
+            return [table[v] for v in values]
+        except KeyError:
+            for i, v in enumerate(values):
+                self._lookup(table, field, v, i)
+            raise
+
+    def category_tables(self):
+        # Keyed by CreditInput field name
+        return {
+            "gender": self.gender, "education": self.education,
+            "marital_status": self.marital, "home_ownership": self.home,
+        }
+
+    def encode_category(self, field, values, index_rows=True):
+        # Codes for one categorical field. Pass index_rows=False when `values`
+        # are not request rows (e.g. an Arrow dictionary), so an
+        # UnknownCategoryError does not point at a misleading row.
+        table = self.category_tables()[field]
+        if index_rows:
+            return self._column(table, field, values)
+        return [self._lookup(table, field, v) for v in values]
+
+    def encode_columns(self, age, gender, income, education, marital_status, children, home_ownership):
+        X = np.empty((len(age), 7), dtype=np.float64)
+        X[:, 0] = age
+        X[:, 1] = self._column(self.gender, "gender", gender)
+        X[:, 2] = income
+        X[:, 3] = self._column(self.education, "education", education)
+        X[:, 4] = self._column(self.marital, "marital_status", marital_status)
+        X[:, 5] = children
+        X[:, 6] = self._column(self.home, "home_ownership", home_ownership)
+        return X
+
+    def encode_records(self, records):
+        return self.encode_columns(
+            [d.age for d in records], [d.gender for d in records], [d.income for d in records],
+            [d.education for d in records], [d.marital_status for d in records],
+            [d.children for d in records], [d.home_ownership for d in records],
+        )
+
+    def decode(self, pred_idx):
+        return self.labels[pred_idx]
+
+    def categories(self, table, codes):
+        # Inverse of _column: encoded codes back to the category strings
+        names = np.empty(len(table), dtype=object)
+        names[list(table.values())] = list(table)
+        return names[np.asarray(codes, dtype=np.intp)]
@@ -0,0 +1,142 @@
+import argparse
+import time
+
+import numpy as np
+
+# ==========================================
+# COMPILED FOREST
+# ==========================================
+# Every tree of a fitted RandomForestClassifier flattened into one set of
+# contiguous node arrays. Leaves point back at themselves, so a batch of rows
+# walks all trees at once with `max_depth` fancy-indexing steps and no masking.
+class CompiledForest:
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, classes):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        # Interleaved (left, right) pairs so one take() picks the next node
+        self.children = np.ascontiguousarray(np.column_stack([left, right]).ravel())
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.classes = classes
+
+    @classmethod
+    def from_sklearn(cls, model):
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+            own = np.arange(n)
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, own, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, own, tree.children_right) + offset)
+
+            # Same normalisation as DecisionTreeClassifier.predict_proba
+            proba = np.array(tree.value[:, 0, :model.n_classes_], dtype=np.float64)
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(proba / normalizer)
+
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            left=np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp),
+            right=np.ascontiguousarray(np.concatenate(rights), dtype=np.intp),
+            value=np.ascontiguousarray(np.concatenate(values)),
+            roots=np.array(roots, dtype=np.intp),
+            max_depth=max_depth,
+            classes=np.asarray(model.classes_),
+        )
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.left, self.right, self.children, self.value, self.roots))
+
+    def apply(self, X):
+        # sklearn compares float32 features against float64 thresholds; do the same
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        flat = X.ravel()
+        row_base = (np.arange(len(X), dtype=np.intp) * X.shape[1])[:, np.newaxis]
+        node = self.roots + np.zeros((len(X), 1), dtype=np.intp)
+        for _ in range(self.max_depth):
+            go_right = flat.take(row_base + self.feature.take(node)) > self.threshold.take(node)
+            node = self.children.take(2 * node + go_right)
+        return node
+
+    def predict_proba(self, X):
+        leaf_values = self.value.take(self.apply(X), axis=0)
+        # cumsum adds trees strictly in order, matching the forest's accumulation
+        proba = np.cumsum(leaf_values, axis=1)[:, -1]
+        proba /= len(self.roots)
+        return proba
+
+    def predict(self, X):
+        return self.classes.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+def verify_parity(forest, model, X):
+    expected = model.predict(X)
+    actual = forest.predict(X)
+    return int(np.count_nonzero(expected != actual))
+
+if __name__ == "__main__":
+    import warnings
+    from train import DEFAULT_MODEL_PATH, generate_logical_data, load_bundle, train_bundle
+
+    parser = argparse.ArgumentParser(description="Check parity and latency of the compiled forest against sklearn.")
+    parser.add_argument("--model", default=None, help=f"artifact path (default: train a fresh model; e.g. {DEFAULT_MODEL_PATH})")
+    parser.add_argument("--rows", type=int, default=20000, help="rows used for the parity check")
+    parser.add_argument("--repeat", type=int, default=200, help="single-row predictions timed per engine")
+    args = parser.parse_args()
+
+    # Feature-name warnings from predicting on plain arrays are noise here
+    warnings.filterwarnings("ignore", category=UserWarning)
+    bundle = load_bundle(args.model) if args.model else train_bundle(seed=0)
+    model = bundle["model"]
+
+    started = time.perf_counter()
+    forest = CompiledForest.from_sklearn(model)
+    print(f"Compiled {len(forest.roots)} trees / {forest.n_nodes} nodes ({forest.nbytes / 1e6:.1f} MB) in {time.perf_counter() - started:.3f}s")
+
+    df = generate_logical_data(args.rows, 1)
+    X = np.column_stack([
+        df['Age'], bundle["le_gender"].transform(df['Gender']), df['Income'] + np.random.default_rng(2).random(len(df)),
+        df['Education'].map(bundle["edu_mapping"]), bundle["le_marital"].transform(df['Marital Status']),
+        df['Number of Children'], bundle["le_home"].transform(df['Home Ownership']),
+    ]).astype(np.float64)
+    # Also probe incomes sitting exactly on split thresholds, where float32 rounding matters
+    thresholds = forest.threshold[(forest.feature == 2) & np.isfinite(forest.threshold)]
+    edges = X[:len(thresholds)].copy()
+    edges[:, 2] = thresholds[:len(edges)]
+    X = np.vstack([X, edges])
+    mismatches = verify_parity(forest, model, X)
+    print(f"Parity: {mismatches} mismatches over {len(X)} rows")
+
+    row = X[:1]
+    for name, predict in (("sklearn", model.predict), ("compiled", forest.predict)):
+        predict(row)
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            predict(row)
+        single = (time.perf_counter() - started) / args.repeat
+        started = time.perf_counter()
+        predict(X)
+        batch = time.perf_counter() - started
+        print(f"{name:>9}: single row {single * 1e6:9.1f} us | {len(X)} rows {batch * 1e3:8.1f} ms")
+
+    if mismatches:
+        raise SystemExit(1)
@@ -1,93 +1,138 @@
-import pandas as pd
-import numpy as np
-import random
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
-from pydantic import BaseModel, Field
+import asyncio
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response
+from pydantic import BaseModel, Field, ValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import LabelEncoder
+from assets import StaticAsset, load_static, static_url
+from batching import MicroBatcher
+from bulk import MEDIA_TYPES, BodyStreamingResponse, MultipartFile, detect_format, format_results, iter_lines, parse_csv_header, parse_csv_rows, parse_ndjson_rows
+from cache import PredictionCache
+from errors import UnknownCategoryError
+from explain import Facts, explain_batch, explain_one
+from metrics import MetricsMiddleware, Registry
+
+# Per-stage timings, request counters and startup durations for /metrics.
+# CREDIT_METRICS=0 turns every timer into a no-op.
+registry = Registry(enabled=os.environ.get("CREDIT_METRICS", "1") == "1")
+STAGE_SECONDS = registry.histogram("credit_stage_duration_seconds", "Time spent in each scoring stage.", ("path", "stage"))
+HTTP_REQUESTS = registry.counter("credit_http_requests_total", "HTTP requests by method, route and status.", ("method", "route", "status"))
+HTTP_SECONDS = registry.histogram("credit_http_request_duration_seconds", "End-to-end HTTP request latency.", ("method", "route"))
+STARTUP_SECONDS = registry.gauge("credit_startup_duration_seconds", "Duration of model loading, training and index build at startup.", ("phase",))
+MODEL_INFO = registry.gauge("credit_model_info", "Version of the model currently served.", ("version",))
+MODEL_TRAIN_SECONDS = registry.gauge("credit_model_train_seconds", "Offline fit time of the model currently served.")
+RETRAINS = registry.counter("credit_retrains_total", "Background retraining jobs by outcome.", ("outcome",))
+SCORING_STAGES = ("validate", "encode", "cache", "predict", "decode", "explain")
+SINGLE_STAGE = {stage: STAGE_SECONDS.labels("single", stage) for stage in SCORING_STAGES}
+BATCH_STAGE = {stage: STAGE_SECONDS.labels("batch", stage) for stage in SCORING_STAGES}
+COLUMNAR_STAGE = {stage: STAGE_SECONDS.labels("columnar", stage) for stage in ("validate", "predict")}
 
 # ==========================================
-# 1. INTELLIGENT DATA GENERATION
+# 1. MODEL LOADING
 # ==========================================
-def generate_logical_data(n=2000):
-    data = []
-    for _ in range(n):
-        age = random.randint(18, 70)
-        gender = random.choice(["Male", "Female"])
-        marital = random.choice(["Single", "Married"])
-        children = random.choices([0, 1, 2, 3], weights=[40, 30, 20, 10])[0]
-        
-        edu_options = ["High School Diploma", "Associate's Degree", "Bachelor's Degree", "Master's Degree", "Doctorate"]
-        edu = random.choice(edu_options)
-        
-        # Income logic
-        if edu == "High School Diploma": income = random.randint(25000, 55000)
-        elif edu == "Associate's Degree": income = random.randint(40000, 70000)
-        elif edu == "Bachelor's Degree": income = random.randint(55000, 95000)
-        elif edu == "Master's Degree": income = random.randint(80000, 140000)
-        else: income = random.randint(100000, 200000)
-        income += random.randint(-5000, 15000)
-
-        # Asset logic
-        if income > 85000: home = random.choices(["Owned", "Rented"], weights=[80, 20])[0]
-        else: home = random.choices(["Owned", "Rented"], weights=[30, 70])[0]
-
-        # Scoring Logic (The Rules)
-        points = 0
-        if income > 90000: points += 50
-        elif income > 60000: points += 30
-        else: points += 10
-        
-        if home == "Owned": points += 20
-        if age > 35: points += 10
-        if edu in ["Master's Degree", "Doctorate"]: points += 15
-        elif edu == "Bachelor's Degree": points += 5
-        
-        if marital == "Married": points += 10
-        if children > 2: points -= 5
-        if children == 0: points += 5
-
-        # Thresholds
-        if points >= 80: score = "High"
-        elif points >= 50: score = "Average"
-        else: score = "Low"
-
-        data.append([age, gender, income, edu, marital, children, home, score])
-
-    columns = ['Age', 'Gender', 'Income', 'Education', 'Marital Status', 'Number of Children', 'Home Ownership', 'Credit Score']
-    return pd.DataFrame(data, columns=columns)
-
-# Generate Data
-df = generate_logical_data(2000)
-
-# --- PREPROCESSING ---
-edu_mapping = {
-    "High School Diploma": 0, "Associate's Degree": 1, "Bachelor's Degree": 2, 
-    "Master's Degree": 3, "Doctorate": 4
-}
-df['Education_Enc'] = df['Education'].map(edu_mapping)
-
-le_gender = LabelEncoder()
-df['Gender_Enc'] = le_gender.fit_transform(df['Gender'])
-
-le_marital = LabelEncoder()
-df['Marital_Enc'] = le_marital.fit_transform(df['Marital Status'])
-
-le_home = LabelEncoder()
-df['Home_Enc'] = le_home.fit_transform(df['Home Ownership'])
-
-le_target = LabelEncoder()
-df['Target'] = le_target.fit_transform(df['Credit Score'])
-
-X = df[['Age', 'Gender_Enc', 'Income', 'Education_Enc', 'Marital_Enc', 'Number of Children', 'Home_Enc']]
-y = df['Target']
-
-model = RandomForestClassifier(n_estimators=200, max_depth=12, random_state=42)
-model.fit(X, y)
-
-print("✅ Model Trained")
+# The model is trained and exported by train.py; fall back to training
+# in-process when no artifact exists so `python main.py` keeps working.
+# Loading runs on a background thread started by the lifespan, so the server
+# binds at once and /readyz reports when scoring is possible. The scoring
+# stack (numpy, pandas, sklearn) is imported there too, which keeps
+# `import main` about as cheap as importing FastAPI.
+MODEL_PATH = os.environ.get("CREDIT_MODEL_PATH", "model.joblib")  # same default as train.DEFAULT_MODEL_PATH
+COMPILED_MAX_ROWS = int(os.environ.get("CREDIT_COMPILED_MAX_ROWS", "256"))
+# Exact per-combination income breakpoints for single-row lookups. Exported
+# artifacts embed it; otherwise it is built off the request path.
+SURFACE_INDEX_ENABLED = os.environ.get("CREDIT_SURFACE_INDEX", "1") == "1"
+
+# The model being served, None until loaded. A retrain replaces this reference
+# in one assignment; handlers read it once per request, so a swap never
+# blocks or mixes models.
+serving = None
+model_error = None
+_model_lock = threading.Lock()
+
+def open_model(bundle):
+    from serving import ServingModel
+    return ServingModel(bundle, surface_index=SURFACE_INDEX_ENABLED, compiled_max_rows=COMPILED_MAX_ROWS)
+
+def load_model(background_index=True):
+    # Blocking and idempotent: concurrent callers wait for the first load
+    global serving
+    with _model_lock:
+        if serving is not None:
+            return serving
+        from train import load_bundle, train_bundle
+
+        started = time.perf_counter()
+        if os.path.exists(MODEL_PATH):
+            bundle = load_bundle(MODEL_PATH)
+            model_load_seconds = time.perf_counter() - started
+            STARTUP_SECONDS.set(model_load_seconds, "model_load")
+            print(f"✅ Model {bundle['model_version']} Loaded from {MODEL_PATH} in {model_load_seconds:.3f}s")
+        else:
+            # Only here does startup include a fit; an artifact's fit happened offline
+            bundle = train_bundle()
+            train_seconds = time.perf_counter() - started
+            STARTUP_SECONDS.set(train_seconds, "train")
+            print(f"✅ Model Trained in {train_seconds:.2f}s (no artifact at {MODEL_PATH}, run train.py to export one)")
+
+        model = open_model(bundle)
+        MODEL_INFO.set(1, model.version)
+        MODEL_TRAIN_SECONDS.set(bundle["train_seconds"])
+        serving = model
+
+    if SURFACE_INDEX_ENABLED and model.surface_index is None:
+        if background_index:
+            threading.Thread(target=build_surface_index, args=(model,), daemon=True).start()
+        else:
+            build_surface_index(model)
+    return model
+
+def load_model_in_background():
+    def run():
+        global model_error
+        try:
+            load_model()
+        except Exception as exc:
+            model_error = exc
+            print(f"❌ Model failed to load: {exc!r}")
+
+    threading.Thread(target=run, name="model-loader", daemon=True).start()
+
+def current_model():
+    model = serving
+    if model is None:
+        detail = "Model is still loading." if model_error is None else "Model failed to load."
+        raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": "1"})
+    return model
+
+def build_surface_index(model):
+    build_seconds = model.build_surface_index()
+    STARTUP_SECONDS.set(build_seconds, "surface_index_build")
+    print(f"✅ Decision surface index built in {build_seconds:.2f}s ({model.surface_index.nbytes / 1e6:.2f} MB)")
+
+# Repeat applicants skip scoring entirely. Keys carry the model version, so a
+# swapped model never serves stale entries; clear() just frees the memory.
+prediction_cache = PredictionCache(
+    maxsize=int(os.environ.get("CREDIT_CACHE_SIZE", "10000")),
+    ttl=float(os.environ.get("CREDIT_CACHE_TTL", "300")),
+)
+
+def cache_key(version, row):
+    return (version, *row.tolist())
+
+def freeze_result(result):
+    return (result["credit_score"], tuple(result["analysis"]["positive"]), tuple(result["analysis"]["negative"]), result["model_version"])
+
+def thaw_result(entry):
+    credit_score, pos, neg, model_version = entry
+    return {"credit_score": credit_score, "analysis": {"positive": list(pos), "negative": list(neg)}, "model_version": model_version}
 
 # ==========================================
 # 2. HTML INTERFACE
@@ -99,8 +144,8 @@ html_content = """
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Credit Score AI</title>
-    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600&family=Poppins:wght@500;600;700&display=swap" rel="stylesheet">
-    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
+    <link rel="stylesheet" href="/static/inter.css">
+    <link rel="stylesheet" href="/static/icons.css">
     
     <style>
         :root {
@@ -138,7 +183,7 @@ html_content = """
 
         .app-container.active .analysis-card { width: 400px; opacity: 1; padding: 30px; transform: translateX(0); }
         
-        h1 { font-family: 'Poppins', sans-serif; font-size: 24px; color: var(--text-dark); text-align: center; }
+        h1 { font-family: 'Poppins', 'Inter', sans-serif; font-size: 24px; color: var(--text-dark); text-align: center; }
         p.subtext { color: #6b7280; font-size: 13px; text-align: center; margin-bottom: 25px; }
 
         .grid-row { display: grid; grid-template-columns: 1fr 1fr; gap: 15px; }
@@ -161,7 +206,7 @@ html_content = """
         .result-area { margin-top: 20px; display: none; }
         .status-badge {
             padding: 15px; border-radius: 12px; text-align: center; 
-            font-family: 'Poppins', sans-serif; font-weight: 700; font-size: 18px;
+            font-family: 'Poppins', 'Inter', sans-serif; font-weight: 700; font-size: 18px;
             margin-bottom: 10px; display: flex; align-items: center; justify-content: center; gap: 10px;
         }
         
@@ -262,7 +307,7 @@ html_content = """
         <!-- RIGHT: ANALYSIS CARD -->
         <div class="analysis-card" id="analysisCard">
             <div class="analysis-header">
-                <h2 style="font-family:'Poppins',sans-serif; font-size:18px; color:#1f2937;">
+                <h2 style="font-family:'Poppins','Inter',sans-serif; font-size:18px; color:#1f2937;">
                     <i class="fa-solid fa-magnifying-glass-chart" style="color:var(--primary);"></i> Decision Logic
                 </h2>
                 <p style="font-size:12px; color:#9ca3af;">Why did the AI make this decision?</p>
@@ -369,11 +414,42 @@ html_content = """
 </html>
 """
 
+# Encoded and gzipped once; `/` and `/static/*` only pick a representation (assets.py)
+static_assets = load_static()
+home_html = html_content
+for name in ("inter.css", "icons.css"):
+    home_html = home_html.replace(f"/static/{name}", static_url(static_assets, name))
+home_page = StaticAsset(home_html.encode(), "text/html; charset=utf-8", fingerprinted=False)
+
 # ==========================================
 # 3. API
 # ==========================================
-app = FastAPI()
+# Optional serving mode: coalesce concurrent /predict calls into micro-batches
+MICROBATCH_ENABLED = os.environ.get("CREDIT_MICROBATCH", "0") == "1"
+MICROBATCH_MAX_SIZE = int(os.environ.get("CREDIT_MICROBATCH_MAX_SIZE", "64"))
+MICROBATCH_WAIT_MS = float(os.environ.get("CREDIT_MICROBATCH_WAIT_MS", "2"))
+batcher = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if serving is None:
+        load_model_in_background()
+    if batcher is not None:
+        await batcher.start()
+    yield
+    if batcher is not None:
+        await batcher.stop()
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
+app.add_middleware(MetricsMiddleware, registry=registry, requests=HTTP_REQUESTS, latency=HTTP_SECONDS)
+
+@app.exception_handler(UnknownCategoryError)
+async def unknown_category_handler(request: Request, exc: UnknownCategoryError):
+    loc = ["body", exc.field] if exc.index is None else ["body", exc.index, exc.field]
+    return JSONResponse(status_code=422, content={"detail": [{
+        "type": "enum", "loc": loc, "msg": str(exc), "input": exc.value, "ctx": {"expected": exc.allowed},
+    }]})
 
 class CreditInput(BaseModel):
     age: int = Field(..., ge=0)
@@ -385,75 +461,418 @@ class CreditInput(BaseModel):
     home_ownership: str
 
 @app.get("/", response_class=HTMLResponse)
-def home():
-    return html_content
-
-@app.post("/predict")
-def predict_credit_score(data: CreditInput):
-    edu_mapping = {"High School Diploma": 0, "Associate's Degree": 1, "Bachelor's Degree": 2, "Master's Degree": 3, "Doctorate": 4}
-    gender_enc = le_gender.transform([data.gender])[0]
-    marital_enc = le_marital.transform([data.marital_status])[0]
-    home_enc = le_home.transform([data.home_ownership])[0]
-    edu_enc = edu_mapping.get(data.education, 0)
-
-    features = np.array([[data.age, gender_enc, data.income, edu_enc, marital_enc, data.children, home_enc]])
-    
-    pred_idx = model.predict(features)[0]
-    result_text = le_target.inverse_transform([pred_idx])[0]
-
-    # --- ENHANCED EXPLANATION LOGIC ---
-    pos = []
-    neg = []
-
-    # Income Logic
-    if data.income >= 90000: 
-        pos.append(f"Strong Income: ${data.income:,.0f} is a tier-1 indicator.")
-    elif data.income < 40000: 
-        neg.append(f"Low Income: ${data.income:,.0f} is below approval threshold.")
-    elif data.income < 60000:
-        neg.append("Moderate Income: Limits high-tier approval without other assets.")
-    
-    # Home Logic
-    if data.home_ownership == "Owned": 
-        pos.append("Asset Verified: Home ownership provides strong collateral.")
-    else: 
-        # Only negative if income is also weak
-        if data.income < 70000:
-            neg.append("Risk Factor: Renting combined with moderate income increases risk.")
-        else:
-            neg.append("Note: Renting status requires higher income verification.")
-
-    # Marital & Children Logic
-    if data.marital_status == "Married": 
-        pos.append("Stability: Marital status is a positive stability indicator.")
-    
-    if data.children > 2: 
-        neg.append(f"Liability: {data.children} dependents increases monthly obligations.")
-    elif data.children == 0: 
-        pos.append("Low Liability: No financial dependents detected.")
-
-    # Education Logic
-    if data.education in ["Master's Degree", "Doctorate"]: 
-        pos.append(f"Education: {data.education} correlates with repayment consistency.")
-    elif data.education == "High School Diploma" and result_text != "High":
-        neg.append("Profile: Limited academic background affects score ceiling.")
-        
-    # --- SPECIFIC AVERAGE/LOW REASONS ---
-    if result_text == "Average":
-        if len(neg) == 0:
-            neg.append("Review Reason: Profile meets minimums but lacks strong assets (like Home or High Income).")
-        elif data.home_ownership == "Rented" and data.income > 50000:
-             neg.append("Conditional: Good income, but lack of property asset triggers manual review.")
-    
-    if result_text == "Low":
-        if data.income < 40000 and data.home_ownership == "Rented":
-            neg.append("Critical: Combination of Low Income and Renting is high risk.")
-
+def home(request: Request):
+    return home_page.respond(request)
+
+@app.get("/static/{name}")
+def static_file(name: str, request: Request):
+    asset = static_assets.get(name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return asset.respond(request)
+
+def explain_prediction(data: CreditInput, result_text: str):
+    # The rules themselves live in explain.RULES
+    pos, neg = explain_one(Facts.from_input(data, result_text))
     return {
         "credit_score": result_text,
         "analysis": {"positive": pos, "negative": neg}
     }
 
+def predict_credit_score(data: CreditInput):
+    model = current_model()
+    watch = registry.stopwatch()
+    features = model.encoder.encode_row(data)
+    watch.lap(SINGLE_STAGE["encode"])
+    key = cache_key(model.version, features[0])
+    cached = prediction_cache.get(key)
+    watch.lap(SINGLE_STAGE["cache"])
+    if cached is not None:
+        return thaw_result(cached)
+
+    pred_idx = model.predict_row(features[0])
+    watch.lap(SINGLE_STAGE["predict"])
+    result_text = model.encoder.decode(pred_idx)
+    watch.lap(SINGLE_STAGE["decode"])
+
+    result = explain_prediction(data, result_text)
+    result["model_version"] = model.version
+    watch.lap(SINGLE_STAGE["explain"])
+    prediction_cache.put(key, freeze_result(result))
+    return result
+
+def observe_validation(request: Request, stages):
+    # Body read + JSON parsing + pydantic validation all happen before the
+    # handler runs; the metrics middleware stamped the arrival time.
+    started = request.scope.get("state", {}).get("request_started")
+    if started is not None and registry.enabled:
+        stages["validate"].observe(time.perf_counter() - started)
+
+@app.post("/predict")
+async def predict(data: CreditInput, request: Request):
+    observe_validation(request, SINGLE_STAGE)
+    current_model()
+    if batcher is not None:
+        try:
+            return await batcher.submit(data)
+        except UnknownCategoryError as exc:
+            # The row index refers to the internal micro-batch, not this request
+            exc.index = None
+            raise
+    return await run_in_threadpool(predict_credit_score, data)
+
+def score_records(records, use_cache=True):
+    if not records:
+        return []
+
+    # Encode column-wise through the lookup tables for the whole batch
+    model = current_model()
+    watch = registry.stopwatch()
+    features = model.encoder.encode_records(records)
+    watch.lap(BATCH_STAGE["encode"])
+    if use_cache:
+        keys = [cache_key(model.version, row) for row in features]
+        results = [prediction_cache.get(key) for key in keys]
+    else:
+        results = [None] * len(records)
+    misses = [i for i, cached in enumerate(results) if cached is None]
+    watch.lap(BATCH_STAGE["cache"])
+
+    # One forest pass over every row the cache could not answer
+    if misses:
+        pred_idx = model.predict_encoded(features[misses])
+        watch.lap(BATCH_STAGE["predict"])
+        result_texts = model.encoder.decode(pred_idx)
+        watch.lap(BATCH_STAGE["decode"])
+        # Large batches evaluate every rule once over whole columns
+        positives, negatives = explain_batch([records[i] for i in misses], features[misses], result_texts, model.encoder)
+        for i, result_text, pos, neg in zip(misses, result_texts, positives, negatives):
+            result = {"credit_score": result_text, "analysis": {"positive": pos, "negative": neg}, "model_version": model.version}
+            if use_cache:
+                prediction_cache.put(keys[i], freeze_result(result))
+            results[i] = result
+        watch.lap(BATCH_STAGE["explain"])
+    return [thaw_result(r) if isinstance(r, tuple) else r for r in results]
+
+@app.post("/predict/batch")
+def predict_credit_score_batch(batch: List[CreditInput], request: Request):
+    observe_validation(request, BATCH_STAGE)
+    return score_records(batch)
+
+# --- BULK FILE SCORING ---
+UPLOAD_CHUNK_ROWS = int(os.environ.get("CREDIT_UPLOAD_CHUNK_ROWS", "1000"))
+
+def score_upload_rows(first_row, rows):
+    tables = current_model().encoder.category_tables()
+    results = [None] * len(rows)
+    valid, positions = [], []
+    for i, row in enumerate(rows):
+        if isinstance(row, Exception):
+            results[i] = {"row": first_row + i, "error": str(row)}
+            continue
+        try:
+            data = CreditInput(**row)
+        except ValidationError as exc:
+            errors = "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors())
+            results[i] = {"row": first_row + i, "error": errors}
+            continue
+        unknown = [UnknownCategoryError(field, getattr(data, field), table)
+                   for field, table in tables.items() if getattr(data, field) not in table]
+        if unknown:
+            results[i] = {"row": first_row + i, "error": "; ".join(map(str, unknown))}
+            continue
+        valid.append(data)
+        positions.append(i)
+
+    # Scored in one pass; the retry only covers a model with other categories
+    # swapped in meanwhile. Bulk files bypass the cache so they cannot flush
+    # interactive traffic.
+    scored = []
+    while valid:
+        try:
+            scored = score_records(valid, use_cache=False)
+            break
+        except UnknownCategoryError as exc:
+            results[positions[exc.index]] = {"row": first_row + positions[exc.index], "error": str(exc)}
+            del valid[exc.index], positions[exc.index]
+    for i, result in zip(positions, scored):
+        results[i] = {"row": first_row + i, **result}
+    return results
+
+@app.post("/predict/upload")
+async def predict_upload(request: Request, fmt: Optional[str] = Query(None, alias="format")):
+    current_model()
+    content_type = request.headers.get("content-type", "")
+    # Either way the file is parsed straight off the socket as it arrives
+    if content_type.startswith("multipart/form-data"):
+        try:
+            upload = MultipartFile(request.stream(), content_type)
+            found = await upload.open()
+        except ValueError as exc:
+            raise HTTPException(status_code=422, detail=str(exc))
+        if not found:
+            raise HTTPException(status_code=422, detail="Expected a 'file' field in the multipart form.")
+        fmt = fmt or detect_format(upload.content_type, upload.filename)
+        source = upload.chunks()
+    else:
+        # Raw CSV/NDJSON body
+        fmt = fmt or detect_format(content_type)
+        source = request.stream()
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=415, detail="Upload CSV (text/csv) or NDJSON (application/x-ndjson).")
+
+    lines = iter_lines(source)
+    header = None
+    if fmt == "csv":
+        try:
+            header = parse_csv_header(await anext(lines, ""))
+        except ValueError as exc:
+            raise HTTPException(status_code=422, detail=str(exc))
+
+    async def stream_results():
+        first_row = 0
+        pending = []
+        failure = None
+        while True:
+            # An overlong line or a malformed multipart body ends the upload
+            # with an error record after the rows read before it
+            try:
+                line = await anext(lines)
+            except StopAsyncIteration:
+                break
+            except ValueError as exc:
+                failure = str(exc)
+                break
+            if line.strip():
+                pending.append(line)
+            if len(pending) >= UPLOAD_CHUNK_ROWS:
+                rows = parse_csv_rows(pending, header) if header else parse_ndjson_rows(pending)
+                results = await run_in_threadpool(score_upload_rows, first_row, rows)
+                yield format_results(results, fmt, header=first_row == 0)
+                first_row += len(rows)
+                pending = []
+        rows = parse_csv_rows(pending, header) if header else parse_ndjson_rows(pending)
+        results = await run_in_threadpool(score_upload_rows, first_row, rows)
+        if failure is not None:
+            results.append({"row": first_row + len(rows), "error": failure})
+        yield format_results(results, fmt, header=first_row == 0)
+
+    return BodyStreamingResponse(stream_results(), media_type=MEDIA_TYPES[fmt])
+
+# --- BINARY COLUMNAR SCORING ---
+# Arrays in, class indices out: no pydantic, explanations or cache. The
+# layouts are documented in columnar.py, which (like the model) pulls in
+# numpy and is therefore imported on first use.
+def score_columnar(body, media_type):
+    import columnar
+
+    model = current_model()
+    watch = registry.stopwatch()
+    if media_type == columnar.ARROW_MEDIA_TYPE:
+        X = columnar.parse_arrow(body, model.encoder)
+    else:
+        X = columnar.parse_raw(body)
+    columnar.validate(X, model.encoder)
+    watch.lap(COLUMNAR_STAGE["validate"])
+    classes = model.predict_encoded(X).astype("uint8")
+    watch.lap(COLUMNAR_STAGE["predict"])
+    return model, classes
+
+@app.get("/predict/columnar")
+def columnar_schema():
+    import columnar
+
+    model = current_model()
+    return {**columnar.schema(model.encoder), "model_version": model.version}
+
+@app.post("/predict/columnar")
+async def predict_columnar(request: Request):
+    import columnar
+
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if media_type == columnar.ARROW_MEDIA_TYPE and columnar.pa is None:
+        raise HTTPException(status_code=415, detail=f"Arrow IPC needs pyarrow on the server; send {columnar.RAW_MEDIA_TYPE} instead.")
+    if media_type not in (columnar.RAW_MEDIA_TYPE, columnar.ARROW_MEDIA_TYPE):
+        raise HTTPException(status_code=415, detail=f"Send {columnar.RAW_MEDIA_TYPE} or {columnar.ARROW_MEDIA_TYPE}.")
+    current_model()
+    body = await request.body()
+    try:
+        model, classes = await run_in_threadpool(score_columnar, body, media_type)
+    except UnknownCategoryError:
+        raise
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    return Response(classes.tobytes(), media_type="application/octet-stream", headers={
+        "X-Class-Labels": ",".join(model.encoder.labels), "X-Model-Version": model.version,
+    })
+
+# --- PROBES ---
+@app.get("/healthz")
+async def healthz():
+    # Liveness. A failed load never recovers by itself, so ask for a restart
+    if model_error is not None:
+        return JSONResponse(status_code=503, content={"status": "failed", "error": repr(model_error)})
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    model = serving
+    if model is None:
+        return JSONResponse(status_code=503, content={"status": "loading" if model_error is None else "failed"})
+    return {"status": "ready", "model_version": model.version, "surface_index": model.surface_index is not None}
+
+@app.get("/cache/stats")
+def cache_stats():
+    return prediction_cache.stats()
+
+def collect_cache_metrics():
+    stats = prediction_cache.stats()
+    yield "credit_cache_entries", "gauge", "Entries currently held by the prediction cache.", stats["size"]
+    for event in ("hits", "misses", "evictions", "expirations", "invalidations"):
+        yield f"credit_cache_{event}_total", "counter", f"Prediction cache {event}.", stats[event]
+
+registry.add_collector(collect_cache_metrics)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+# --- BACKGROUND RETRAINING ---
+# train.py runs as a child process with every core, so fitting never competes
+# with the server for the GIL, and hands the artifact back on disk. The
+# candidate is scored against the current model on a fresh holdout and, if
+# accepted, swapped in.
+TRAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "train.py")
+RETRAIN_SAMPLES = int(os.environ.get("CREDIT_RETRAIN_SAMPLES", "2000"))
+# The child allocates in proportion to this, and an accepted job replaces the artifact on disk
+RETRAIN_MAX_SAMPLES = int(os.environ.get("CREDIT_RETRAIN_MAX_SAMPLES", "100000"))
+RETRAIN_HOLDOUT = int(os.environ.get("CREDIT_RETRAIN_HOLDOUT", "5000"))
+RETRAIN_TOLERANCE = float(os.environ.get("CREDIT_RETRAIN_TOLERANCE", "0.02"))
+# The job report is mirrored to a file next to the artifact, so every worker
+# answers GET /admin/retrain alike, including after prefork.py replaces the
+# worker that ran the job
+RETRAIN_STATUS_PATH = f"{MODEL_PATH}.retrain.json"
+retrain_job = {"status": "idle"}
+retrain_task = None
+# Called after a swap; prefork.py uses it to move every worker to the new model
+model_swap_hook = None
+
+# /admin/* is disabled unless CREDIT_ADMIN_TOKEN is set, and then requires it
+# as a bearer token (which a cross-origin page cannot attach on its own)
+ADMIN_TOKEN = os.environ.get("CREDIT_ADMIN_TOKEN")
+
+def require_admin(request: Request):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Missing or invalid admin token.", headers={"WWW-Authenticate": "Bearer"})
+
+class RetrainInput(BaseModel):
+    samples: int = Field(RETRAIN_SAMPLES, gt=0, le=RETRAIN_MAX_SAMPLES)
+    seed: Optional[int] = None
+
+def save_retrain_job():
+    partial = f"{RETRAIN_STATUS_PATH}.{os.getpid()}.tmp"
+    with open(partial, "w") as f:
+        json.dump(retrain_job, f)
+    os.replace(partial, RETRAIN_STATUS_PATH)
+
+def load_retrain_job():
+    from serving import acquire_retrain_lock
+
+    try:
+        with open(RETRAIN_STATUS_PATH) as f:
+            job = json.load(f)
+    except (OSError, ValueError):
+        return {"status": "idle"}
+    if job.get("status") == "running":
+        # Nobody holds the lock: the process running the job died mid-way
+        lock = acquire_retrain_lock(MODEL_PATH)
+        if lock is not None:
+            lock.close()
+            job["status"] = "interrupted"
+    return job
+
+def swap_model(candidate):
+    global serving
+    serving = candidate
+    # Old entries can no longer be hit (keys carry the version); free them
+    prediction_cache.clear()
+    MODEL_INFO.clear()
+    MODEL_INFO.set(1, candidate.version)
+    MODEL_TRAIN_SECONDS.set(candidate.bundle["train_seconds"])
+    if model_swap_hook is not None:
+        model_swap_hook()
+
+async def run_retrain(params: RetrainInput, lock):
+    from serving import candidate_path, validate_candidate
+    from train import load_bundle
+
+    path = None
+    args = ["--samples", str(params.samples), "--n-jobs", "-1"]
+    if params.seed is not None:
+        args += ["--seed", str(params.seed)]
+    # Keep the serving model's hyperparameters (e.g. exported by tune.py) rather than train.py's defaults
+    current = serving
+    hyperparameters = current.bundle.get("hyperparameters") if current is not None else None
+    if hyperparameters:
+        args += ["--trees", str(hyperparameters["n_estimators"]), "--max-depth", str(hyperparameters["max_depth"]),
+                 "--min-samples-leaf", str(hyperparameters["min_samples_leaf"])]
+    if not SURFACE_INDEX_ENABLED:
+        args.append("--no-surface")
+    try:
+        path = candidate_path(MODEL_PATH)
+        process = await asyncio.create_subprocess_exec(sys.executable, TRAIN_SCRIPT, "--out", path, *args)
+        if await process.wait() != 0:
+            raise RuntimeError(f"train.py exited with status {process.returncode}")
+        candidate = await run_in_threadpool(lambda: open_model(load_bundle(path)))
+        retrain_job.update(model_version=candidate.version, train_seconds=candidate.bundle["train_seconds"])
+        report = await run_in_threadpool(validate_candidate, candidate, serving, RETRAIN_HOLDOUT, None, RETRAIN_TOLERANCE)
+        retrain_job.update(report)
+        if report["accepted"]:
+            # Persist first so a restart serves the same model; the mapping stays valid
+            os.replace(path, MODEL_PATH)
+            swap_model(candidate)
+            retrain_job["status"] = "swapped"
+        else:
+            retrain_job["status"] = "rejected"
+    except Exception as exc:
+        retrain_job.update(status="failed", error=repr(exc))
+    finally:
+        # Rejected, or train.py / loading failed: nothing else will pick it up
+        if path is not None and os.path.exists(path):
+            os.remove(path)
+        retrain_job["finished_at"] = time.time()
+        save_retrain_job()
+        lock.close()
+        RETRAINS.inc(retrain_job["status"])
+        print(f"✅ Retrain {retrain_job['status']}: model {serving.version} is serving")
+
+@app.post("/admin/retrain", status_code=202, dependencies=[Depends(require_admin)])
+async def retrain(params: Optional[RetrainInput] = None):
+    global retrain_task
+    from serving import acquire_retrain_lock
+
+    current_model()
+    # Held until the job finishes, so it also covers sibling worker processes
+    lock = acquire_retrain_lock(MODEL_PATH)
+    if lock is None:
+        raise HTTPException(status_code=409, detail="A retraining job is already running.")
+    params = params or RetrainInput()
+    retrain_job.clear()
+    retrain_job.update(status="running", started_at=time.time(), samples=params.samples, previous_version=serving.version)
+    save_retrain_job()
+    retrain_task = asyncio.create_task(run_retrain(params, lock))
+    return retrain_job
+
+@app.get("/admin/retrain", dependencies=[Depends(require_admin)])
+def retrain_status():
+    return {**load_retrain_job(), "serving_version": getattr(serving, "version", None)}
+
+if MICROBATCH_ENABLED:
+    batcher = MicroBatcher(score_records, max_batch_size=MICROBATCH_MAX_SIZE, max_wait_ms=MICROBATCH_WAIT_MS)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
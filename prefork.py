@@ -0,0 +1,105 @@
+import argparse
+import gc
+import os
+import signal
+import socket
+import time
+import traceback
+
+# ==========================================
+# PREFORK SERVER
+# ==========================================
+# `uvicorn --workers N` starts N fresh interpreters, each of which imports
+# pandas/sklearn and loads its own copy of the model. Here the parent loads
+# the model and surface index once, moves the heap into gc's permanent
+# generation (gc.freeze) so collections in the workers never write to those
+# pages, then forks workers that share it copy-on-write and accept on one
+# inherited socket.
+#
+# SIGHUP reloads CREDIT_MODEL_PATH in the parent and replaces the workers;
+# a worker that swaps in a retrained model sends it, so all of them follow.
+# Metrics and the prediction cache stay per worker.
+def bind_socket(host, port, backlog=2048):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+def load_shared_model(main):
+    started = time.perf_counter()
+    gc.unfreeze()
+    main.serving = None
+    model = main.load_model(background_index=False)
+    gc.collect()
+    gc.freeze()
+    print(f"✅ Model {model.version} ready in parent in {time.perf_counter() - started:.2f}s")
+
+def run_worker(main, sock, log_level):
+    import uvicorn
+
+    for sig in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+        signal.signal(sig, signal.SIG_DFL)
+    parent = os.getppid()
+    main.model_swap_hook = lambda: os.kill(parent, signal.SIGHUP)
+    uvicorn.Server(uvicorn.Config(main.app, log_level=log_level)).run(sockets=[sock])
+
+def fork_worker(main, sock, log_level):
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(main, sock, log_level)
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+def serve(host="0.0.0.0", port=8000, workers=2, log_level="info"):
+    import main
+
+    sock = bind_socket(host, port)
+    load_shared_model(main)
+    events = []
+    signal.signal(signal.SIGHUP, lambda sig, frame: events.append("reload"))
+    signal.signal(signal.SIGTERM, lambda sig, frame: events.append("stop"))
+    signal.signal(signal.SIGINT, lambda sig, frame: events.append("stop"))
+
+    pids = {fork_worker(main, sock, log_level) for _ in range(workers)}
+    print(f"✅ Serving on http://{host}:{port} with {workers} workers: {sorted(pids)}")
+    while "stop" not in events:
+        if "reload" in events:
+            events.clear()
+            load_shared_model(main)
+            # New workers start accepting before the old ones drain and exit
+            old, pids = pids, {fork_worker(main, sock, log_level) for _ in range(workers)}
+            for pid in old:
+                os.kill(pid, signal.SIGTERM)
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid = 0
+        if pid in pids:
+            print(f"❌ Worker {pid} exited with status {status}; restarting it")
+            pids.discard(pid)
+            time.sleep(1)
+            pids.add(fork_worker(main, sock, log_level))
+        elif not pid:
+            time.sleep(0.2)
+
+    for pid in pids:
+        os.kill(pid, signal.SIGTERM)
+    for pid in pids:
+        os.waitpid(pid, 0)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve main:app from forked workers that share one loaded model.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes (default: CPU count)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, args.log_level)
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from features import FeatureEncoder
+from forest import CompiledForest
+from surface import DecisionSurfaceIndex
+from train import generate_logical_data
+
+# ==========================================
+# SERVING MODEL
+# ==========================================
+# Everything derived from one trained bundle. An instance is never mutated
+# once published (apart from a surface index filled in by a background
+# build), so request handlers read main's current reference once and keep
+# scoring with it even if a retrain swaps in a newer model meanwhile.
+class ServingModel:
+    def __init__(self, bundle, surface_index=True, compiled_max_rows=256):
+        self.bundle = bundle
+        self.version = bundle["model_version"]
+        self.model = bundle["model"]
+        self.encoder = FeatureEncoder.from_bundle(bundle)
+        # Flat-array copy of the forest for low-latency scoring; sklearn's own
+        # predict still wins on large batches where its per-call overhead is amortised.
+        self.forest = CompiledForest.from_sklearn(self.model)
+        self.compiled_max_rows = compiled_max_rows
+        self.surface_index = bundle.get("surface") if surface_index else None
+
+    def predict_encoded(self, features):
+        if len(features) <= self.compiled_max_rows:
+            return self.forest.predict(features)
+        return self.model.predict(features)
+
+    def predict_row(self, row):
+        pred_idx = None if self.surface_index is None else self.surface_index.predict_row(row)
+        if pred_idx is None:
+            pred_idx = self.predict_encoded(row[np.newaxis])[0]
+        return pred_idx
+
+    def build_surface_index(self):
+        started = time.perf_counter()
+        self.surface_index = DecisionSurfaceIndex.build(self.forest, self.encoder)
+        return time.perf_counter() - started
+
+    def accuracy(self, df):
+        X = self.encoder.encode_columns(
+            df['Age'], df['Gender'], df['Income'], df['Education'],
+            df['Marital Status'], df['Number of Children'], df['Home Ownership'],
+        )
+        return float(np.mean(self.encoder.decode(self.predict_encoded(X)) == df['Credit Score'].to_numpy()))
+
+# ==========================================
+# RETRAINING
+# ==========================================
+def validate_candidate(candidate, current, n=5000, seed=None, tolerance=0.02):
+    # Both models score the same fresh holdout; the candidate may trail the
+    # current model by at most `tolerance` accuracy
+    holdout = generate_logical_data(n, seed)
+    report = {"holdout_rows": n, "candidate_accuracy": candidate.accuracy(holdout)}
+    if current is not None:
+        report["current_accuracy"] = current.accuracy(holdout)
+    report["accepted"] = report["candidate_accuracy"] >= report.get("current_accuracy", 0.0) - tolerance
+    return report
+
+def candidate_path(model_path):
+    # Unique per job, next to the artifact so os.replace stays a same-filesystem rename
+    root, ext = os.path.splitext(os.path.basename(model_path))
+    fd, path = tempfile.mkstemp(prefix=f"{root}.candidate-", suffix=ext or ".joblib",
+                                dir=os.path.dirname(os.path.abspath(model_path)))
+    os.close(fd)
+    return path
+
+def acquire_retrain_lock(model_path):
+    # One job per artifact across every process serving it (prefork or
+    # uvicorn workers). Returns the open lock file, or None if another process
+    # holds it; the lock goes with the file's close, or the holder's exit.
+    import fcntl
+
+    lock = open(f"{model_path}.lock", "a")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock.close()
+        return None
+    return lock
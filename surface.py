@@ -0,0 +1,233 @@
+import argparse
+import time
+
+import numpy as np
+
+INCOME = 2
+# Discrete inputs in model column order, with the Income column left out
+DISCRETE_COLUMNS = (1, 4, 3, 6, 5, 0)  # Gender, Marital, Education, Home, Children, Age
+TIE_MARGIN = 1e-8
+
+# ==========================================
+# DECISION SURFACE INDEX
+# ==========================================
+# Every feature except Income takes a handful of discrete values, and for a
+# fixed combination of them the forest is piecewise-constant in income. The
+# index stores, per combination, the income breakpoints where the predicted
+# class changes, so scoring a row is a mixed-radix lookup plus a binary search.
+#
+# Regions are delimited by the forest's own Income thresholds: a (float32-cast)
+# income v falls in region r = #{thresholds < v}, exactly as the trees see it.
+class DecisionSurfaceIndex:
+    def __init__(self, domains, offsets, bounds, classes):
+        self.domains = domains
+        self.offsets = offsets
+        self.bounds = bounds
+        self.classes = classes
+        self._lows = [int(d[0]) for d in domains]
+        self._highs = [int(d[-1]) for d in domains]
+        self._sizes = [len(d) for d in domains]
+
+    @property
+    def n_combinations(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + self.bounds.nbytes + self.classes.nbytes
+
+    def _combination(self, row):
+        combo = 0
+        for column, low, high, size in zip(DISCRETE_COLUMNS, self._lows, self._highs, self._sizes):
+            value = row[column]
+            if not low <= value <= high or value != int(value):
+                return None
+            combo = combo * size + int(value) - low
+        return combo
+
+    def predict_row(self, row):
+        # Returns None when the row falls outside the indexed domain
+        combo = self._combination(row)
+        if combo is None:
+            return None
+        start, end = self.offsets[combo], self.offsets[combo + 1]
+        run = self.bounds[start:end].searchsorted(np.float32(row[INCOME]), side="left")
+        return self.classes[start + combo + run]
+
+    @classmethod
+    def build(cls, forest, encoder, children=range(0, 11), ages=range(18, 71)):
+        domains = [
+            np.arange(len(encoder.gender)), np.arange(len(encoder.marital)),
+            np.arange(len(encoder.education)), np.arange(len(encoder.home)),
+            np.arange(children.start, children.stop), np.arange(ages.start, ages.stop),
+        ]
+        n_trees = len(forest.roots)
+        thresholds = np.unique(forest.threshold[(forest.feature == INCOME) & np.isfinite(forest.threshold)])
+        n_regions = len(thresholds) + 1
+
+        # --- LEAF BOXES: (lo, hi] per feature along each root-to-leaf path ---
+        n_nodes = forest.n_nodes
+        is_leaf = forest.left == np.arange(n_nodes)
+        lo = np.full((n_nodes, 7), -np.inf)
+        hi = np.full((n_nodes, 7), np.inf)
+        frontier = forest.roots
+        while frontier.size:
+            internal = frontier[~is_leaf[frontier]]
+            feature, threshold = forest.feature[internal], forest.threshold[internal]
+            left, right = forest.left[internal], forest.right[internal]
+            lo[left], hi[left] = lo[internal], hi[internal]
+            lo[right], hi[right] = lo[internal], hi[internal]
+            hi[left, feature] = threshold
+            lo[right, feature] = threshold
+            frontier = np.concatenate([left, right])
+        leaves = np.flatnonzero(is_leaf)
+        lo, hi, values = lo[leaves], hi[leaves], forest.value[leaves]
+
+        # Children and Age values the forest never separates (e.g. every child
+        # count above the last split) share one dense slot and are expanded later
+        slots = []
+        for column, domain in zip(DISCRETE_COLUMNS[4:], domains[4:]):
+            splits = np.unique(forest.threshold[forest.feature == column])
+            _, first, inverse = np.unique(np.searchsorted(splits, domain), return_index=True, return_inverse=True)
+            slots.append((domain[first], inverse))
+        axes = list(domains[:4]) + [values for values, _ in slots]
+
+        # Index ranges [start, stop) each leaf covers along every axis
+        starts, stops = [], []
+        for column, axis in zip(DISCRETE_COLUMNS, axes):
+            starts.append(np.searchsorted(axis, lo[:, column], side="right"))
+            stops.append(np.searchsorted(axis, hi[:, column], side="right"))
+        starts.append(np.where(np.isfinite(lo[:, INCOME]), np.searchsorted(thresholds, lo[:, INCOME]) + 1, 0))
+        stops.append(np.where(np.isfinite(hi[:, INCOME]), np.searchsorted(thresholds, hi[:, INCOME]) + 1, n_regions))
+        starts, stops = np.array(starts), np.array(stops)
+        covered = np.all(starts < stops, axis=0)
+        starts, stops, values = starts[:, covered], stops[:, covered], values[covered]
+
+        # --- DENSE EVALUATION, one categorical group at a time ---
+        # Leaf values are summed with an n-d difference array; cells whose top
+        # two classes are within rounding error (mostly exact ties) are re-scored
+        # with the compiled forest so ties break exactly like sklearn.
+        n_children, n_ages = len(axes[4]), len(axes[5])
+        (_, children_slot), (_, age_slot) = slots
+        representatives = _region_representatives(thresholds)
+        labels = []
+        for group in np.ndindex(*(len(axis) for axis in axes[:4])):
+            match = np.ones(starts.shape[1], dtype=bool)
+            for i, g in enumerate(group):
+                match &= (starts[i] <= g) & (g < stops[i])
+            (c0, a0, r0), (c1, a1, r1) = starts[4:, match], stops[4:, match]
+            v = values[match]
+            diff = np.zeros((v.shape[1], n_children + 1, n_ages + 1, n_regions + 1))
+            for c, a, r, sign in (
+                (c0, a0, r0, 1), (c1, a0, r0, -1), (c0, a1, r0, -1), (c0, a0, r1, -1),
+                (c1, a1, r0, 1), (c1, a0, r1, 1), (c0, a1, r1, 1), (c1, a1, r1, -1),
+            ):
+                for k in range(v.shape[1]):
+                    np.add.at(diff[k], (c, a, r), sign * v[:, k])
+            # Prefix sums: slab-wise adds along the short axes beat cumsum there
+            for i in range(1, n_children + 1):
+                diff[:, i] += diff[:, i - 1]
+            for i in range(1, n_ages + 1):
+                diff[:, :, i] += diff[:, :, i - 1]
+            np.cumsum(diff, axis=3, out=diff)
+            proba = diff[:, :n_children, :n_ages, :n_regions]
+            label = np.argmax(proba, axis=0)
+
+            top, bottom = proba.max(axis=0), proba.min(axis=0)
+            runner_up = proba.sum(axis=0) - top - bottom if len(proba) == 3 else np.sort(proba, axis=0)[-2]
+            ties = np.argwhere(top - runner_up <= TIE_MARGIN * n_trees)
+            if len(ties):
+                X = np.empty((len(ties), 7))
+                for column, g in zip(DISCRETE_COLUMNS[:4], group):
+                    X[:, column] = g
+                X[:, DISCRETE_COLUMNS[4]] = axes[4][ties[:, 0]]
+                X[:, DISCRETE_COLUMNS[5]] = axes[5][ties[:, 1]]
+                X[:, INCOME] = representatives[ties[:, 2]]
+                label[tuple(ties.T)] = np.searchsorted(forest.classes, forest.predict(X))
+            labels.append(label[children_slot][:, age_slot].reshape(-1, n_regions))
+        labels = np.concatenate(labels)
+
+        # --- COMPRESSION: keep only the breakpoints where the class changes ---
+        combo, region = np.nonzero(labels[:, 1:] != labels[:, :-1])
+        counts = np.bincount(combo, minlength=len(labels))
+        offsets = np.zeros(len(labels) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        bounds = thresholds[region]
+        # Each combination has one more run than it has breakpoints; its first
+        # run sits at offsets[combo] + combo in the flat classes array
+        run_combo = np.repeat(np.arange(len(labels)), counts + 1)
+        run_region = np.zeros(len(run_combo), dtype=np.int64)
+        run_region[np.arange(len(bounds)) + combo + 1] = region + 1
+        classes = forest.classes[labels[run_combo, run_region]]
+
+        return cls(domains, offsets, bounds, classes)
+
+def _region_representatives(thresholds):
+    # A float32 income inside each region: the largest one <= the region's upper
+    # threshold, and just above the last threshold for the open-ended region
+    upper = thresholds.astype(np.float32)
+    upper = np.where(upper > thresholds, np.nextafter(upper, np.float32(-np.inf)), upper)
+    if len(thresholds):
+        last = np.float32(thresholds[-1])
+        while last <= thresholds[-1]:
+            last = np.nextafter(last, np.float32(np.inf))
+    else:
+        last = np.float32(0)
+    return np.append(upper, last).astype(np.float64)
+
+if __name__ == "__main__":
+    import warnings
+    from features import FeatureEncoder
+    from forest import CompiledForest
+    from train import DEFAULT_MODEL_PATH, load_bundle, train_bundle
+
+    parser = argparse.ArgumentParser(description="Build the decision surface index and check it against sklearn.")
+    parser.add_argument("--model", default=None, help=f"artifact path (default: train a fresh model; e.g. {DEFAULT_MODEL_PATH})")
+    parser.add_argument("--rows", type=int, default=20000, help="random in-domain rows used for the parity check")
+    parser.add_argument("--repeat", type=int, default=2000, help="single-row lookups timed")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=UserWarning)
+    bundle = load_bundle(args.model) if args.model else train_bundle(seed=0)
+    model = bundle["model"]
+    forest = CompiledForest.from_sklearn(model)
+    encoder = FeatureEncoder.from_bundle(bundle)
+
+    started = time.perf_counter()
+    index = DecisionSurfaceIndex.build(forest, encoder)
+    build_seconds = time.perf_counter() - started
+    print(f"Built index over {index.n_combinations} combinations / {len(index.bounds)} breakpoints "
+          f"({index.nbytes / 1e6:.2f} MB) in {build_seconds:.2f}s")
+
+    rng = np.random.default_rng(3)
+    n = args.rows
+    X = np.column_stack([
+        rng.integers(18, 71, n), rng.integers(0, 2, n), rng.uniform(0, 250000, n), rng.integers(0, 5, n),
+        rng.integers(0, 2, n), rng.integers(0, 11, n), rng.integers(0, 2, n),
+    ]).astype(np.float64)
+    # Incomes exactly on, and one float32 step either side of, every stored breakpoint
+    edges = X[rng.integers(0, n, len(index.bounds))].copy()
+    edges[:, INCOME] = index.bounds
+    nudged = edges.copy()
+    nudged[:, INCOME] = np.nextafter(index.bounds.astype(np.float32), np.float32(np.inf))
+    X = np.vstack([X, edges, nudged])
+
+    expected = model.predict(X)
+    got = np.array([index.predict_row(row) for row in X])
+    mismatches = int(np.count_nonzero(got != expected))
+    print(f"Parity: {mismatches} mismatches over {len(X)} rows")
+
+    row = X[0]
+    engines = (
+        ("sklearn", lambda: model.predict(row[np.newaxis]), 50),
+        ("compiled", lambda: forest.predict(row[np.newaxis]), args.repeat),
+        ("index", lambda: index.predict_row(row), args.repeat),
+    )
+    for name, predict, repeat in engines:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            predict()
+        print(f"{name:>9}: single row {(time.perf_counter() - started) / repeat * 1e6:9.1f} us")
+
+    if mismatches:
+        raise SystemExit(1)
@@ -0,0 +1,188 @@
+import argparse
+import os
+import time
+import uuid
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder
+
+from features import FeatureEncoder
+from forest import CompiledForest
+from surface import DecisionSurfaceIndex
+
+# Bump whenever the layout of the artifact dict changes
+ARTIFACT_VERSION = 1
+DEFAULT_MODEL_PATH = os.environ.get("CREDIT_MODEL_PATH", "model.joblib")
+
+EDU_MAPPING = {
+    "High School Diploma": 0, "Associate's Degree": 1, "Bachelor's Degree": 2,
+    "Master's Degree": 3, "Doctorate": 4
+}
+
+FEATURE_COLUMNS = ['Age', 'Gender_Enc', 'Income', 'Education_Enc', 'Marital_Enc', 'Number of Children', 'Home_Enc']
+
+# ==========================================
+# 1. INTELLIGENT DATA GENERATION
+# ==========================================
+GENDERS = ["Male", "Female"]
+MARITAL_STATUSES = ["Single", "Married"]
+HOME_OWNERSHIPS = ["Owned", "Rented"]
+EDU_OPTIONS = ["High School Diploma", "Associate's Degree", "Bachelor's Degree", "Master's Degree", "Doctorate"]
+CREDIT_SCORES = ["Low", "Average", "High"]
+DATA_COLUMNS = ['Age', 'Gender', 'Income', 'Education', 'Marital Status', 'Number of Children', 'Home Ownership', 'Credit Score']
+
+CHILDREN_WEIGHTS = np.array([40, 30, 20, 10]) / 100
+# Inclusive base income range per education level, indexed like EDU_OPTIONS
+INCOME_LOW = np.array([25000, 40000, 55000, 80000, 100000])
+INCOME_HIGH = np.array([55000, 70000, 95000, 140000, 200000])
+
+def generate_logical_columns(n=2000, rng=None):
+    rng = np.random.default_rng(rng)
+
+    age = rng.integers(18, 70, n, endpoint=True)
+    gender = rng.integers(0, len(GENDERS), n)
+    marital = rng.integers(0, len(MARITAL_STATUSES), n)
+    children = rng.choice(len(CHILDREN_WEIGHTS), n, p=CHILDREN_WEIGHTS)
+    edu = rng.integers(0, len(EDU_OPTIONS), n)
+
+    # Income logic
+    income = rng.integers(INCOME_LOW[edu], INCOME_HIGH[edu], endpoint=True)
+    income += rng.integers(-5000, 15000, n, endpoint=True)
+
+    # Asset logic
+    owned = rng.random(n) < np.where(income > 85000, 0.8, 0.3)
+
+    # Scoring Logic (The Rules)
+    points = np.select([income > 90000, income > 60000], [50, 30], 10)
+    points += np.where(owned, 20, 0)
+    points += np.where(age > 35, 10, 0)
+    points += np.select([edu >= 3, edu == 2], [15, 5], 0)
+
+    points += np.where(marital == 1, 10, 0)
+    points -= np.where(children > 2, 5, 0)
+    points += np.where(children == 0, 5, 0)
+
+    # Thresholds
+    score = np.select([points >= 80, points >= 50], [2, 1], 0)
+
+    return {
+        'Age': age,
+        'Gender': np.array(GENDERS, dtype=object)[gender],
+        'Income': income,
+        'Education': np.array(EDU_OPTIONS, dtype=object)[edu],
+        'Marital Status': np.array(MARITAL_STATUSES, dtype=object)[marital],
+        'Number of Children': children,
+        'Home Ownership': np.array(HOME_OWNERSHIPS, dtype=object)[np.where(owned, 0, 1)],
+        'Credit Score': np.array(CREDIT_SCORES, dtype=object)[score],
+    }
+
+def iter_logical_chunks(n, chunk_size=1_000_000, rng=None):
+    # Yields column dicts of at most chunk_size rows so huge sets never sit in memory at once
+    rng = np.random.default_rng(rng)
+    for start in range(0, n, chunk_size):
+        yield generate_logical_columns(min(chunk_size, n - start), rng)
+
+def generate_logical_data(n=2000, rng=None):
+    return pd.DataFrame(generate_logical_columns(n, rng), columns=DATA_COLUMNS)
+
+# ==========================================
+# 2. TRAINING
+# ==========================================
+def encode_training_data(df):
+    # --- PREPROCESSING ---
+    df['Education_Enc'] = df['Education'].map(EDU_MAPPING)
+
+    le_gender = LabelEncoder()
+    df['Gender_Enc'] = le_gender.fit_transform(df['Gender'])
+
+    le_marital = LabelEncoder()
+    df['Marital_Enc'] = le_marital.fit_transform(df['Marital Status'])
+
+    le_home = LabelEncoder()
+    df['Home_Enc'] = le_home.fit_transform(df['Home Ownership'])
+
+    le_target = LabelEncoder()
+    df['Target'] = le_target.fit_transform(df['Credit Score'])
+
+    X = df[FEATURE_COLUMNS]
+    y = df['Target'].to_numpy()
+    encoders = {
+        "le_gender": le_gender,
+        "le_marital": le_marital,
+        "le_home": le_home,
+        "le_target": le_target,
+        "edu_mapping": dict(EDU_MAPPING),
+    }
+    return X, y, encoders
+
+def train_bundle(n=2000, n_estimators=200, max_depth=12, random_state=42, n_jobs=None, seed=None, min_samples_leaf=1):
+    # Only X and y outlive this line; the raw DataFrame is freed before fitting
+    X, y, encoders = encode_training_data(generate_logical_data(n, seed))
+
+    started = time.perf_counter()
+    model = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth, min_samples_leaf=min_samples_leaf,
+                                   random_state=random_state, n_jobs=n_jobs)
+    model.fit(X, y)
+    # Training parallelism should not leak into single-row serving
+    model.set_params(n_jobs=None)
+
+    return {
+        "artifact_version": ARTIFACT_VERSION,
+        # The timestamp orders versions; the suffix keeps models trained in the same second apart
+        "model_version": f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}",
+        "trained_at": time.time(),
+        "train_seconds": time.perf_counter() - started,
+        "n_samples": n,
+        "hyperparameters": {"n_estimators": n_estimators, "max_depth": max_depth, "min_samples_leaf": min_samples_leaf},
+        "model": model,
+        **encoders,
+    }
+
+# ==========================================
+# 3. ARTIFACT I/O
+# ==========================================
+def attach_surface_index(bundle):
+    started = time.perf_counter()
+    bundle["surface"] = DecisionSurfaceIndex.build(CompiledForest.from_sklearn(bundle["model"]), FeatureEncoder.from_bundle(bundle))
+    return time.perf_counter() - started
+
+def save_bundle(bundle, path=DEFAULT_MODEL_PATH):
+    # Uncompressed on purpose: joblib can only memory-map raw numpy buffers
+    tmp_path = f"{path}.tmp"
+    joblib.dump(bundle, tmp_path, compress=0)
+    os.replace(tmp_path, path)
+    return path
+
+def load_bundle(path=DEFAULT_MODEL_PATH, mmap=True):
+    bundle = joblib.load(path, mmap_mode="r" if mmap else None)
+    version = bundle.get("artifact_version") if isinstance(bundle, dict) else None
+    if version != ARTIFACT_VERSION:
+        raise ValueError(f"Unsupported model artifact version {version!r} in {path} (expected {ARTIFACT_VERSION})")
+    return bundle
+
+def parse_depth(value):
+    return None if value.lower() == "none" else int(value)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the credit score model and export it as an on-disk artifact.")
+    parser.add_argument("--out", default=DEFAULT_MODEL_PATH, help="artifact path (default: %(default)s)")
+    parser.add_argument("--samples", type=int, default=2000, help="synthetic training rows")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the synthetic data generator")
+    parser.add_argument("--no-surface", action="store_true", help="skip embedding the decision surface index")
+    parser.add_argument("--n-jobs", type=int, default=None, help="cores used by RandomForestClassifier.fit")
+    parser.add_argument("--trees", type=int, default=200, help="n_estimators (default: %(default)s)")
+    parser.add_argument("--max-depth", type=parse_depth, default=12, help="tree depth limit, or 'none' (default: %(default)s)")
+    parser.add_argument("--min-samples-leaf", type=int, default=1, help="(default: %(default)s)")
+    args = parser.parse_args()
+
+    bundle = train_bundle(n=args.samples, n_estimators=args.trees, max_depth=args.max_depth, n_jobs=args.n_jobs,
+                          seed=args.seed, min_samples_leaf=args.min_samples_leaf)
+    print(f"✅ Model Trained in {bundle['train_seconds']:.2f}s")
+    if not args.no_surface:
+        build_seconds = attach_surface_index(bundle)
+        print(f"✅ Decision surface index built in {build_seconds:.2f}s ({bundle['surface'].nbytes / 1e6:.2f} MB)")
+    save_bundle(bundle, args.out)
+    print(f"✅ Model {bundle['model_version']} exported to {args.out} ({os.path.getsize(args.out) / 1e6:.1f} MB)")
@@ -0,0 +1,174 @@
+import argparse
+import itertools
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import StratifiedKFold, cross_val_score
+
+from bench import timeit
+from forest import CompiledForest
+from train import (DEFAULT_MODEL_PATH, attach_surface_index, encode_training_data, generate_logical_data,
+                   parse_depth, save_bundle, train_bundle)
+
+# ==========================================
+# HYPERPARAMETER SEARCH
+# ==========================================
+# Sweeps n_estimators x max_depth x min_samples_leaf over the same X/y that
+# train_bundle fits on. Cross-validation runs in a process pool, one
+# candidate per task with single-threaded fits so the pool owns the cores.
+# Latency is measured afterwards, one candidate at a time, so candidates
+# don't slow each other down:
+#   single_row_us  one row through CompiledForest (surface index misses,
+#                  batches up to compiled_max_rows)
+#   batch_row_us   per-row cost of sklearn's predict on a 1000-row batch
+#   size_mb        pickled estimator, i.e. what the artifact carries
+# A candidate is on the Pareto front when no other one is at least as good on
+# accuracy, single-row latency and size, and strictly better on one of them.
+SEED = 0
+BATCH_ROWS = 1000
+
+def parse_grid(value, cast=int):
+    return [cast(item) for item in value.split(",")]
+
+def cross_validate(params, X, y, folds, seed):
+    model = RandomForestClassifier(**params, random_state=42, n_jobs=1)
+    cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+    started = time.perf_counter()
+    scores = cross_val_score(model, X, y, cv=cv)
+    cv_seconds = time.perf_counter() - started
+    # The model that would ship: every row, same seed as train_bundle
+    model.fit(X, y)
+    return params, scores.tolist(), cv_seconds, model
+
+def measure(model, X):
+    forest = CompiledForest.from_sklearn(model)
+    row = X[:1]
+    batch = X[:BATCH_ROWS]
+    return {
+        "single_row_us": timeit(lambda: forest.predict(row), warmup=20) * 1e6,
+        "batch_row_us": timeit(lambda: model.predict(batch)) / len(batch) * 1e6,
+        "size_mb": len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)) / 1e6,
+        "nodes": forest.n_nodes,
+    }
+
+def pareto_front(results):
+    def dominates(a, b):
+        at_least = (a["cv_accuracy"] >= b["cv_accuracy"] and a["single_row_us"] <= b["single_row_us"]
+                    and a["size_mb"] <= b["size_mb"])
+        better = (a["cv_accuracy"] > b["cv_accuracy"] or a["single_row_us"] < b["single_row_us"]
+                  or a["size_mb"] < b["size_mb"])
+        return at_least and better
+    return [r["id"] for r in results if not any(dominates(other, r) for other in results)]
+
+def search(grid, samples=2000, seed=SEED, folds=5, jobs=None):
+    X, y, _ = encode_training_data(generate_logical_data(samples, seed))
+    X = X.to_numpy(dtype=np.float32)
+    candidates = [
+        {"n_estimators": trees, "max_depth": depth, "min_samples_leaf": leaf}
+        for trees, depth, leaf in itertools.product(grid["n_estimators"], grid["max_depth"], grid["min_samples_leaf"])
+    ]
+
+    started = time.perf_counter()
+    fitted = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(cross_validate, params, X, y, folds, seed) for params in candidates]
+        for done, future in enumerate(as_completed(futures), 1):
+            params, scores, cv_seconds, model = future.result()
+            fitted.append((params, scores, cv_seconds, model))
+            print(f"[{done}/{len(candidates)}] {params} cv={np.mean(scores):.4f} ({cv_seconds:.1f}s)")
+    search_seconds = time.perf_counter() - started
+
+    results = []
+    for params, scores, cv_seconds, model in sorted(fitted, key=lambda item: candidates.index(item[0])):
+        results.append({
+            "id": len(results),
+            **params,
+            "cv_accuracy": float(np.mean(scores)),
+            "cv_std": float(np.std(scores)),
+            "cv_seconds": cv_seconds,
+            **measure(model, X),
+        })
+    front = set(pareto_front(results))
+    for result in results:
+        result["pareto"] = result["id"] in front
+
+    return {
+        "samples": samples,
+        "seed": seed,
+        "folds": folds,
+        "search_seconds": search_seconds,
+        "candidates": results,
+    }
+
+def select(report, max_latency_us=None, max_size_mb=None):
+    # Most accurate Pareto candidate within the budgets; ties go to the faster one
+    eligible = [
+        r for r in report["candidates"]
+        if r["pareto"]
+        and (max_latency_us is None or r["single_row_us"] <= max_latency_us)
+        and (max_size_mb is None or r["size_mb"] <= max_size_mb)
+    ]
+    if not eligible:
+        return None
+    return max(eligible, key=lambda r: (round(r["cv_accuracy"], 4), -r["single_row_us"]))
+
+def print_report(report, chosen=None):
+    print(f"\n{'id':>3} {'trees':>5} {'depth':>5} {'leaf':>4} {'cv acc':>14} {'1-row µs':>9} "
+          f"{'batch µs/row':>12} {'size MB':>8} {'nodes':>7}")
+    for r in sorted(report["candidates"], key=lambda r: -r["cv_accuracy"]):
+        mark = ">" if chosen is not None and r["id"] == chosen["id"] else ("*" if r["pareto"] else " ")
+        print(f"{r['id']:>3} {r['n_estimators']:>5} {str(r['max_depth']):>5} {r['min_samples_leaf']:>4} "
+              f"{r['cv_accuracy']:>8.4f}±{r['cv_std']:.4f} {r['single_row_us']:>9.1f} "
+              f"{r['batch_row_us']:>12.2f} {r['size_mb']:>8.2f} {r['nodes']:>7} {mark}")
+    print("* Pareto front (accuracy / single-row latency / size)   > selected")
+
+def export(candidate, path, samples, seed, surface=True):
+    params = {name: candidate[name] for name in ("n_estimators", "max_depth", "min_samples_leaf")}
+    bundle = train_bundle(n=samples, seed=seed, n_jobs=-1, **params)
+    if surface:
+        attach_surface_index(bundle)
+    save_bundle(bundle, path)
+    return bundle
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-validated hyperparameter search with a latency/size Pareto report.")
+    parser.add_argument("--trees", type=parse_grid, default=[50, 100, 200], help="n_estimators grid (default: 50,100,200)")
+    parser.add_argument("--depths", type=lambda v: parse_grid(v, parse_depth), default=[6, 8, 12, None],
+                        help="max_depth grid, 'none' for unlimited (default: 6,8,12,none)")
+    parser.add_argument("--leaves", type=parse_grid, default=[1, 3, 5], help="min_samples_leaf grid (default: 1,3,5)")
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes (default: CPU count)")
+    parser.add_argument("--out", default="tune.json", help="JSON report path (default: %(default)s)")
+    parser.add_argument("--max-latency-us", type=float, default=None, help="single-row latency budget for selection")
+    parser.add_argument("--max-size-mb", type=float, default=None, help="model size budget for selection")
+    parser.add_argument("--pick", type=int, default=None, help="candidate id to select instead of the automatic choice")
+    parser.add_argument("--export", nargs="?", const=DEFAULT_MODEL_PATH, default=None, metavar="PATH",
+                        help=f"train the selected candidate and save it as the serving artifact (default: {DEFAULT_MODEL_PATH})")
+    parser.add_argument("--no-surface", action="store_true", help="skip embedding the decision surface index on export")
+    args = parser.parse_args()
+
+    grid = {"n_estimators": args.trees, "max_depth": args.depths, "min_samples_leaf": args.leaves}
+    report = search(grid, samples=args.samples, seed=args.seed, folds=args.folds, jobs=args.jobs)
+    if args.pick is not None:
+        chosen = report["candidates"][args.pick]
+    else:
+        chosen = select(report, args.max_latency_us, args.max_size_mb)
+    report["selected"] = None if chosen is None else chosen["id"]
+
+    print_report(report, chosen)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ {len(report['candidates'])} candidates in {report['search_seconds']:.1f}s, report written to {args.out}")
+
+    if chosen is None:
+        print("❌ No Pareto candidate fits the latency/size budget")
+    elif args.export:
+        bundle = export(chosen, args.export, args.samples, args.seed, surface=not args.no_surface)
+        print(f"✅ Exported candidate {chosen['id']} {bundle['hyperparameters']} as {bundle['model_version']} to {args.export}")